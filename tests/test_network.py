@@ -0,0 +1,88 @@
+import socket
+import threading
+
+from tetrisforge.tetris import (
+    _FRAME_HEADER,
+    PeerSockets,
+    base64_to_ipv4_port,
+    drain_frames,
+    ipv4_port_to_base64,
+    send_frame,
+)
+
+
+def frame(payload):
+    return _FRAME_HEADER.pack(len(payload)) + payload
+
+
+def test_drain_frames_coalesced():
+    buffer = bytearray(frame(b"one") + frame(b"") + frame(b"three"))
+    assert drain_frames(buffer) == [b"one", b"", b"three"]
+    assert buffer == b""
+
+
+def test_drain_frames_split():
+    data = frame(b"hello") + frame(b"world")
+    buffer = bytearray()
+    received = []
+    for i in range(len(data)):
+        buffer += data[i : i + 1]
+        received += drain_frames(buffer)
+    assert received == [b"hello", b"world"]
+    assert buffer == b""
+
+
+def test_drain_frames_keeps_partial_tail():
+    buffer = bytearray(frame(b"done") + frame(b"pending")[:4])
+    assert drain_frames(buffer) == [b"done"]
+    assert buffer == frame(b"pending")[:4]
+
+
+def test_join_code_round_trip():
+    for ip, port in (("127.0.0.1", 5000), ("0.0.0.0", 0), ("255.255.255.255", 65535)):
+        assert base64_to_ipv4_port(ipv4_port_to_base64(ip, port)) == (ip, port)
+
+
+def test_peer_sockets_delivers_messages_and_stops_when_empty():
+    received = []
+    closed = threading.Event()
+
+    def on_message(sock, data):
+        if data == b"bad":
+            raise ValueError(data)
+        received.append(data)
+
+    ours, theirs = socket.socketpair()
+    network = PeerSockets(on_message, lambda sock: closed.set())
+    network.watch_socket(ours)
+    thread = network.start()
+
+    theirs.sendall(frame(b"first") + frame(b"bad") + frame(b"last"))
+    theirs.close()
+
+    assert closed.wait(5)
+    thread.join(5)
+    assert not thread.is_alive()
+    assert received == [b"first", b"last"]
+
+
+def test_peer_sockets_close_stops_the_thread():
+    ours, theirs = socket.socketpair()
+    network = PeerSockets(lambda sock, data: None)
+    network.watch_socket(ours)
+    thread = network.start()
+
+    network.close()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert ours.fileno() == -1
+    theirs.close()
+
+
+def test_send_frame_round_trip():
+    ours, theirs = socket.socketpair()
+    send_frame(ours, b"payload")
+    buffer = bytearray(theirs.recv(64))
+    assert drain_frames(buffer) == [b"payload"]
+    ours.close()
+    theirs.close()
@@ -0,0 +1,71 @@
+import random
+
+from tetrisforge.tetris import (
+    PIECE_BITS,
+    ROTATED_COORDS,
+    Board,
+    XorShift64,
+    _row_masks,
+    bits_collide,
+)
+
+
+def naive_collide(occ, coords, x, y):
+    for dx, dy in coords:
+        col = x + dx
+        row = y - dy
+        if col < 0 or col >= Board.board_width or row < 0 or row >= len(occ):
+            return True
+        if occ[row] >> col & 1:
+            return True
+    return False
+
+
+def random_occupancy(rng, fill):
+    return [
+        sum(1 << x for x in range(Board.board_width) if rng.random() < fill)
+        for _ in range(Board.BoardHeight)
+    ]
+
+
+def test_row_masks_cover_every_cell():
+    for rotations in ROTATED_COORDS[1:]:
+        for coords in rotations:
+            cells = {
+                (min_dx + i, dy)
+                for dy, min_dx, mask in _row_masks(coords)
+                for i in range(mask.bit_length())
+                if mask >> i & 1
+            }
+            assert cells == set(coords)
+
+
+def test_bits_collide_matches_per_cell_check():
+    rng = random.Random(1234)
+    boards = [[0] * Board.BoardHeight] + [
+        random_occupancy(rng, fill) for fill in (0.1, 0.3, 0.6)
+    ]
+    for occ in boards:
+        for shape in range(1, 8):
+            for rotation in range(4):
+                coords = ROTATED_COORDS[shape][rotation]
+                bits = PIECE_BITS[shape][rotation]
+                for x in range(-3, Board.board_width + 3):
+                    for y in range(-3, Board.BoardHeight + 3):
+                        assert bits_collide(
+                            occ, bits, x, y, Board.FullRow
+                        ) == naive_collide(occ, coords, x, y), (shape, rotation, x, y)
+
+
+def test_xorshift_shuffle_is_a_permutation():
+    rng = XorShift64(42)
+    for size in (0, 1, 2, 7, 50):
+        items = list(range(size))
+        rng.shuffle(items)
+        assert sorted(items) == list(range(size))
+
+
+def test_xorshift_randint_stays_in_range():
+    rng = XorShift64(0)  # A zero seed must not get stuck at zero
+    values = {rng.randint(1, 7) for _ in range(1000)}
+    assert values == set(range(1, 8))
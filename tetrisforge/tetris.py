@@ -1,19 +1,32 @@
 import base64
 import ctypes
+import logging
 import os
-import random
+import selectors
 import socket
 import subprocess
 import sys
 import threading
 import time
 import struct
-import traceback
+from collections import deque
 from typing import override
 
 import requests
-from PySide6.QtCore import QBasicTimer, Qt, QTimer, Signal, Slot
-from PySide6.QtGui import QColor, QFont, QPainter, QPen
+from PySide6.QtCore import (
+    QBasicTimer,
+    QLine,
+    QObject,
+    QPoint,
+    QRect,
+    QRunnable,
+    Qt,
+    QThreadPool,
+    QTimer,
+    Signal,
+    Slot,
+)
+from PySide6.QtGui import QColor, QFont, QPainter, QPen, QPolygon
 from PySide6.QtWidgets import (
     QApplication,
     QFrame,
@@ -28,22 +41,212 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+logger = logging.getLogger(__name__)
+
+_IP_PORT = struct.Struct("!BBBBH")  # IPv4 octets followed by the port
+
 def ipv4_port_to_base64(ipv4: str, port: int) -> str:
-    octets = ipv4.split('.')
-    ip_bytes = struct.pack('!BBBB', int(octets[0]), int(octets[1]), int(octets[2]), int(octets[3]))
-    port_bytes = struct.pack('!H', port)
-    combined_bytes = ip_bytes + port_bytes
-    base64_encoded = base64.b64encode(combined_bytes).decode('utf-8')
-    return base64_encoded
-
-def base64_to_ipv4_port(base64_encoded: str) -> (str, int):
-    combined_bytes = base64.b64decode(base64_encoded)
-    ip_bytes = combined_bytes[:4]
-    octets = struct.unpack('!BBBB', ip_bytes)
-    ipv4 = '.'.join(map(str, octets))
-    port_bytes = combined_bytes[4:]
-    port = struct.unpack('!H', port_bytes)[0]
-    return ipv4, port
+    a, b, c, d = ipv4.split('.')
+    packed = _IP_PORT.pack(int(a), int(b), int(c), int(d), port)
+    return base64.b64encode(packed).decode('ascii')
+
+def base64_to_ipv4_port(base64_encoded: str) -> tuple[str, int]:
+    a, b, c, d, port = _IP_PORT.unpack(base64.b64decode(base64_encoded))
+    return f"{a}.{b}.{c}.{d}", port
+
+_FRAME_HEADER = struct.Struct("!H")  # Length prefix of every network message
+RECV_CHUNK_SIZE = 65536
+
+# First byte of every network message
+MSG_START_GAME = ord("S")
+MSG_GAME_OVER = ord("G")
+MSG_BOARD_STATE = ord("B")  # Followed by one byte per board cell
+
+SOCKET_BUFFER_SIZE = 1 << 20
+
+def _tune_socket(sock: socket.socket):
+    """
+    Configure a connected game socket for small, latency-sensitive messages.
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+
+def send_frame(sock: socket.socket, payload: bytes):
+    sock.sendall(_FRAME_HEADER.pack(len(payload)) + payload)
+
+def drain_frames(buffer: bytearray) -> list[bytes]:
+    """
+    Remove every complete length-prefixed message from the front of a buffer.
+    """
+    frames = []
+    offset = 0
+    header_size = _FRAME_HEADER.size
+    while len(buffer) - offset >= header_size:
+        (length,) = _FRAME_HEADER.unpack_from(buffer, offset)
+        end = offset + header_size + length
+        if len(buffer) < end:
+            break
+        frames.append(bytes(buffer[offset + header_size : end]))
+        offset = end
+    del buffer[:offset]
+    return frames
+
+class PeerSockets:
+    """
+    Read length-prefixed messages from a set of sockets on one thread.
+
+    Every complete message is passed to ``on_message(sock, data)``; a socket
+    that closes or fails is unregistered and passed to ``on_close(sock)``.
+    The network thread exits once no socket is left to watch.
+    """
+
+    PollInterval = 0.5  # Seconds between checks for sockets closed elsewhere
+    MaxErrors = 5  # Consecutive loop errors before the network thread gives up
+
+    def __init__(self, on_message, on_close=None):
+        self.on_message = on_message
+        self.on_close = on_close
+        self.on_accept = None
+        self.selector = selectors.DefaultSelector()
+        self.recv_buffers = {}
+        # Every socket is read on the network thread, so one scratch buffer
+        # serves them all; only partial frames are kept per connection
+        self.recv_view = memoryview(bytearray(RECV_CHUNK_SIZE))
+
+    def start(self) -> threading.Thread:
+        """
+        Start the network thread and return it.
+        """
+        thread = threading.Thread(target=self.network_loop, daemon=True)
+        thread.start()
+        return thread
+
+    def listen(self, server_socket: socket.socket, on_accept):
+        """
+        Accept connections on a listening socket and read from each of them.
+
+        ``on_accept(sock, addr)`` runs before the new socket is watched.
+        """
+        self.on_accept = on_accept
+        self.selector.register(
+            server_socket, selectors.EVENT_READ, self.accept_connection
+        )
+
+    def accept_connection(self, server_socket: socket.socket):
+        sock, addr = server_socket.accept()
+        try:
+            _tune_socket(sock)
+            self.on_accept(sock, addr)
+        except Exception:
+            logger.exception("Rejected connection from %s", addr)
+            sock.close()
+            return
+        self.watch_socket(sock)
+
+    def watch_socket(self, sock: socket.socket):
+        self.recv_buffers[sock] = bytearray()
+        self.selector.register(sock, selectors.EVENT_READ, self.read_socket)
+
+    def network_loop(self):
+        """
+        Dispatch readiness events for every registered socket.
+        """
+        errors = 0
+        # An empty selector cannot be waited on (select() fails on Windows)
+        while self.selector.get_map():
+            try:
+                for key, _ in self.selector.select(PeerSockets.PollInterval):
+                    key.data(key.fileobj)
+                errors = 0
+            except Exception:
+                logger.exception("Network loop error")
+                errors += 1
+                if errors >= PeerSockets.MaxErrors:
+                    logger.error("Network loop stopped after %d errors", errors)
+                    return
+
+    def close(self):
+        """
+        Stop watching and close every registered socket.
+        """
+        for key in list(self.selector.get_map().values()):
+            self.selector.unregister(key.fileobj)
+            key.fileobj.close()
+        self.recv_buffers.clear()
+
+    def read_socket(self, sock: socket.socket):
+        try:
+            received = sock.recv_into(self.recv_view)
+        except OSError as e:
+            logger.warning("Receive failed: %s", e)
+            received = 0
+        if not received:
+            self.selector.unregister(sock)
+            del self.recv_buffers[sock]
+            if self.on_close is not None:
+                self.on_close(sock)
+            sock.close()
+            return
+        buffer = self.recv_buffers[sock]
+        buffer += self.recv_view[:received]
+        for message in drain_frames(buffer):
+            # The frames are already out of the buffer, so one failing
+            # message must not take the rest of the batch with it
+            try:
+                self.on_message(sock, message)
+            except Exception:
+                logger.exception("Error handling message")
+
+_EXTERNAL_IP_TTL = 300  # Seconds before the external IP is looked up again
+_external_ip_cache = {"ip": None, "ts": 0.0}
+
+def _external_ip() -> str:
+    """
+    Return the external IP address of this machine, falling back to loopback.
+
+    Successful lookups are cached for ``_EXTERNAL_IP_TTL`` seconds.
+    """
+    now = time.monotonic()
+    if _external_ip_cache["ip"] and now - _external_ip_cache["ts"] < _EXTERNAL_IP_TTL:
+        return _external_ip_cache["ip"]
+    try:
+        response = requests.get("https://api.ipify.org?format=text", timeout=5)
+        if response.status_code != 200:
+            return "127.0.0.1"
+    except Exception:
+        return "127.0.0.1"
+    _external_ip_cache.update(ip=response.text, ts=now)
+    return response.text
+
+class _HostSetupSignals(QObject):
+    host_ready = Signal(str)
+
+class _HostSetupTask(QRunnable):
+    """
+    Open the firewall and resolve the join code on a pool thread.
+
+    ``host`` is the Lobby that owns the listening socket; the join code is
+    delivered back to it through ``signals.host_ready``.
+    """
+
+    def __init__(self, host, port: int):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.signals = _HostSetupSignals()
+
+    @override
+    def run(self):
+        # Always deliver a code so the host is never left waiting for one
+        try:
+            self.host.allow_firewall_access(self.port)
+            join_code = ipv4_port_to_base64(_external_ip(), self.port)
+        except Exception:
+            logger.exception("Host setup failed, falling back to loopback")
+            join_code = ipv4_port_to_base64("127.0.0.1", self.port)
+        self.signals.host_ready.emit(join_code)
 
 class Tetris(QMainWindow):
     """
@@ -102,12 +305,19 @@ class Tetris(QMainWindow):
         print(
             f"Starting game: multiplayer={multiplayer}, is_host={is_host}, join_code={join_code}"
         )
+        network, peers = None, []
+        if multiplayer:
+            # The board takes over the lobby's connections and network thread
+            network = self.lobby.network
+            peers = self.lobby.connected_peers()
         self.tboard = Board(
             self,
             game=self,
             multiplayer=multiplayer,
             is_host=is_host,
             join_code=join_code,
+            network=network,
+            peers=peers,
         )
         self.setCentralWidget(self.tboard)
         self.tboard.msg2Statusbar.connect(self.statusbar.showMessage)
@@ -184,6 +394,11 @@ class Lobby(QWidget):
     Lobby for Tetris multiplayer game.
     """
 
+    # Network events; emitted on the network thread, handled on the GUI thread
+    peer_joined = Signal(object, object)
+    peer_left = Signal(object)
+    peer_message = Signal(object, object)
+
     def __init__(self, parent, game: Tetris, is_host=False, join_code=""):
         super().__init__(parent)
         self.game: Tetris = game
@@ -196,8 +411,13 @@ class Lobby(QWidget):
         self.server_socket: socket.socket
         self.server_port: int
         self.server_thread: threading.Thread
+        self.host_setup_task: _HostSetupTask
         self.client_socket: socket.socket
         self.client_thread: threading.Thread
+        self.peer_joined.connect(self.accept_connection)
+        self.peer_left.connect(self.drop_player)
+        self.peer_message.connect(self.handle_message)
+        self.network = PeerSockets(self.peer_message.emit, self.peer_left.emit)
 
         if self.is_host:
             self.setup_host()
@@ -224,17 +444,21 @@ class Lobby(QWidget):
         self.server_port = self.server_socket.getsockname()[1]
         if not self.is_admin():
             self.run_as_admin()
-        else:
-            self.allow_firewall_access(self.server_port)  # Add firewall rule
-        self.server_thread = threading.Thread(
-            target=self.server_thread_func, daemon=True
-        )
-        self.server_thread.start()
-        host_ip = self.get_external_ip()
-        self.join_code = ipv4_port_to_base64(host_ip, self.server_port)
+        self.network.listen(self.server_socket, self.peer_joined.emit)
+        self.server_thread = self.network.start()
+        # Firewall rule and join code are resolved off the UI thread
+        self.start_button.setEnabled(False)
+        self.host_setup_task = _HostSetupTask(self, self.server_port)
+        self.host_setup_task.signals.host_ready.connect(self.on_host_ready)
+        QThreadPool.globalInstance().start(self.host_setup_task)
+
+    @Slot(str)
+    def on_host_ready(self, join_code):
+        self.join_code = join_code
         loopback_code = ipv4_port_to_base64("127.0.0.1", self.server_port)
         print(f"Join code: {self.join_code}")
         print(f"Loopback code: {loopback_code}")
+        self.start_button.setEnabled(True)
 
     def is_admin(self):
         try:
@@ -254,22 +478,11 @@ class Lobby(QWidget):
             print(f"Failed to elevate privileges: {e}")
         sys.exit(0)
 
-    def get_external_ip(self):
-        # This method retrieves the external IP address of the server
-        try:
-            response = requests.get("https://api.ipify.org?format=text", timeout=10)
-            if response.status_code == 200:
-                return response.text
-            else:
-                return "127.0.0.1"
-        except Exception:
-            return "127.0.0.1"
-
     def allow_firewall_access(self, port):
         if os.name == "nt":  # Only for Windows
             rule_name = f"Tetris_Server_Port_{port}"
             try:
-                subprocess.check_call(
+                subprocess.Popen(
                     [
                         "netsh",
                         "advfirewall",
@@ -281,10 +494,12 @@ class Lobby(QWidget):
                         "action=allow",
                         "protocol=TCP",
                         f"localport={port}",
-                    ]
+                    ],
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
                 )
-                print(f"Firewall rule added for port {port}")
-            except subprocess.CalledProcessError as e:
+                print(f"Firewall rule requested for port {port}")
+            except OSError as e:
                 print(f"Failed to add firewall rule: {e}")
 
     def setup_client(self):
@@ -293,49 +508,43 @@ class Lobby(QWidget):
         self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
             self.client_socket.connect((host, int(port)))
-            self.client_thread = threading.Thread(
-                target=self.client_thread_func, daemon=True
-            )
-            self.client_thread.start()
+            _tune_socket(self.client_socket)
+            self.network.watch_socket(self.client_socket)
+            self.client_thread = self.network.start()
         except ConnectionRefusedError as e:
             print(f"Connection refused: {e}")
         except Exception as e:
             print(f"Failed to connect: {e}")
 
-    def server_thread_func(self):
-        while True:
-            try:
-                client_socket, addr = self.server_socket.accept()
-                self.players.append(client_socket)
-                print(f"Accepted connection from {addr}")
-                self.add_player(f"Player {len(self.players)}")
-                threading.Thread(
-                    target=self.network_loop, args=(client_socket,), daemon=True
-                ).start()
-            except Exception as e:
-                print(f"Server thread error: {e}")
-                traceback.print_exc()
+    @Slot(object, object)
+    def accept_connection(self, client_socket, addr):
+        self.players.append(client_socket)
+        print(f"Accepted connection from {addr}")
+        self.add_player(f"Player {len(self.players)}")
 
-    def client_thread_func(self):
-        try:
-            self.network_loop(self.client_socket)
-        except Exception as e:
-            print(f"Client thread error: {e}")
-            traceback.print_exc()
+    @Slot(object)
+    def drop_player(self, sock):
+        if sock in self.players:
+            self.players_list.takeItem(self.players.index(sock))
+            self.players.remove(sock)
 
-    def network_loop(self, sock):
-        while True:
-            try:
-                data = sock.recv(1024).decode("utf-8")
-                if data:
-                    print(f"Received data: {data}")
-                    if data == "start_game":
-                        print("Received start_game command")
-                        self.game.start_game_from_network(True, False)
-            except Exception as e:
-                print(f"Network loop error: {e}")
-                traceback.print_exc()
-                break
+    def connected_peers(self):
+        """
+        Return the sockets of the other players in the lobby.
+        """
+        if self.is_host:
+            return list(self.players)
+        return [self.client_socket]
+
+    @Slot(object, object)
+    def handle_message(self, sock, data):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received %d bytes", len(data))
+        if not data:
+            return
+        if data[0] == MSG_START_GAME:
+            print("Received start_game command")
+            self.game.start_game_from_network(True, False)
 
     @Slot(str)
     def add_player(self, player_name):
@@ -345,10 +554,9 @@ class Lobby(QWidget):
         for player in self.players:
             try:
                 print("Sending start_game to player")
-                player.send("start_game".encode("utf-8"))
+                send_frame(player, bytes((MSG_START_GAME,)))
             except Exception as e:
-                print(f"Error sending start_game: {e}")
-                traceback.print_exc()
+                logger.warning("Error sending start_game: %s", e)
         self.game.start_game(multiplayer=True, is_host=True, join_code=self.join_code)
 
 
@@ -358,42 +566,90 @@ class Board(QFrame):
     """
 
     msg2Statusbar = Signal(str)
+    # Network events; emitted on the network thread, handled on the GUI thread
+    peer_joined = Signal(object, object)
+    peer_left = Signal(object)
+    peer_message = Signal(object, object)
 
     board_width = 10
     BoardHeight = 22
-    Speed = 300
+    Speed = 300  # Initial drop interval in milliseconds
+    MinSpeed = 50  # Fastest drop interval in milliseconds
+    FullRow = (1 << board_width) - 1  # Occupancy bits of a complete line
     FinalizeDelay = 1000  # Delay in milliseconds
     KeyRepeatDelay = 150  # Delay for repeating key actions
-
-    def __init__(self, parent, game, multiplayer=False, is_host=False, join_code=""):
+    BroadcastInterval = 33  # Milliseconds between board state broadcasts
+    BagPrefetch = 8  # Shuffled 7-bags generated each time the queue runs dry
+
+    ColorTable = (
+        (169, 169, 169),  # NoShape - Dark Gray
+        (255, 69, 69),  # ZShape - Medium Red
+        (60, 179, 113),  # SShape - Medium Green
+        (64, 224, 208),  # LineShape - Medium Cyan
+        (186, 85, 211),  # TShape - Medium Purple
+        (255, 255, 102),  # SquareShape - Medium Yellow
+        (255, 140, 0),  # LShape - Medium Orange
+        (30, 144, 255),  # MirroredLShape - Medium Blue
+    )
+    # Indexed by shape, built once from ColorTable
+    _COLORS = tuple(QColor(*rgb) for rgb in ColorTable)
+    _LIGHTER = tuple(color.lighter() for color in _COLORS)
+    _DARKER = tuple(color.darker() for color in _COLORS)
+    _LIGHT_PENS = tuple(QPen(color, 1) for color in _LIGHTER)
+    _DARK_PENS = tuple(QPen(color, 1) for color in _DARKER)
+    # Text templates for the statistics labels
+    _GOAL_FMT = "Goal: %d"
+    _LEVEL_FMT = "Level: %d"
+    _LINES_TO_GOAL_FMT = "Lines to goal: %d"
+    _SCORE_FMT = "Score: %d"
+    _label_font: QFont | None = None
+
+    def __init__(
+        self,
+        parent,
+        game,
+        multiplayer=False,
+        is_host=False,
+        join_code="",
+        network=None,
+        peers=(),
+    ):
         """
         Initialize the game board.
+
+        In multiplayer, ``network`` is the lobby's PeerSockets and ``peers``
+        are its connected sockets; the board takes both over.
         """
         super().__init__(parent)
         self.game: Tetris = game
         self.multiplayer = multiplayer
         self.is_host = is_host
         self.join_code = join_code
-        self.init_board()
+        self.init_board(network, peers)
         self.timer: QBasicTimer
+        self.square_size_cache: int | None
+        self.preview_offsets_cache: tuple | None
+        self.speed: int
         self.finalize_timer: QTimer
         self.is_waiting_after_line: bool
         self.cur_x: int
         self.cur_y: int
         self.num_lines_removed: int
+        self.occ: list
         self.board: list
+        self.dirty_rows: int
         self.is_started: bool
         self.is_paused: bool
-        self.bag: list
+        self.bag: deque
+        self.bag_source: XorShift64
         self.next_piece: Shape
         self.hold_piece: Shape
         self.current_piece: Shape
         self.hold_used: bool
         self.hold_locked: bool
         self.is_landed: bool
-        self.left_key_timer: QTimer
-        self.right_key_timer: QTimer
-        self.down_key_timer: QTimer
+        self.held_keys: set
+        self.repeat_timer: QTimer
         self.goal: int
         self.num_goals_reached: int
         self.lines_to_goal: int
@@ -403,36 +659,45 @@ class Board(QFrame):
         self.level_label: QLabel
         self.lines_to_goal_label: QLabel
         self.score_label: QLabel
+        self.shown_goal: int | None
+        self.shown_level: int | None
+        self.shown_lines_to_goal: int | None
+        self.shown_score: int | None
         self.other_boards: list
         self.other_boards_layout: QVBoxLayout
         self.other_boards_widget: QWidget
         self.main_layout: QHBoxLayout
-        self.server_socket: socket.socket
-        self.server_port: int
-        self.server_thread: threading.Thread
-        self.client_socket: socket.socket
-        self.client_thread: threading.Thread
-        self.small_board: SmallBoard
+        self.peers: list
+        self.board_state_dirty: bool
+        self.broadcast_timer: QTimer
+        self.network: PeerSockets
+        self.peer_boards: dict
 
-    def init_board(self):
+    def init_board(self, network=None, peers=()):
         """
         Initialize the board settings and state.
         """
         self.timer = QBasicTimer()
+        self.square_size_cache = None
+        self.preview_offsets_cache = None
+        self.speed = Board.Speed
         self.finalize_timer = QTimer(self)
         self.finalize_timer.timeout.connect(self.finalize_piece)
         self.is_waiting_after_line = False
         self.cur_x = 0
         self.cur_y = 0
         self.num_lines_removed = 0
+        self.occ = []
         self.board = []
+        self.dirty_rows = 0
 
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
         self.is_started = False
         self.is_paused = False
         self.clear_board()
 
-        self.bag = []
+        self.bag = deque()
+        self.bag_source = XorShift64()
         self.next_piece = Shape()
         self.next_piece.set_shape(self.get_next_shape())
         self.hold_piece = Shape()
@@ -441,14 +706,10 @@ class Board(QFrame):
         self.hold_locked = False
         self.is_landed = False
 
-        # Timers for key repeats
-        self.left_key_timer = QTimer(self)
-        self.right_key_timer = QTimer(self)
-        self.down_key_timer = QTimer(self)
-
-        self.left_key_timer.timeout.connect(self.move_left)
-        self.right_key_timer.timeout.connect(self.move_right)
-        self.down_key_timer.timeout.connect(self.move_down)
+        # One timer repeats the moves of every held direction key
+        self.held_keys = set()
+        self.repeat_timer = QTimer(self)
+        self.repeat_timer.timeout.connect(self.repeat_held_keys)
 
         self.goal = 10
         self.num_goals_reached = 0
@@ -460,9 +721,31 @@ class Board(QFrame):
         self.level_label = QLabel(self)
         self.lines_to_goal_label = QLabel(self)
         self.score_label = QLabel(self)
+        self.next_piece_label.setText("Next Piece:")
+        self.hold_piece_label.setText("Hold Piece:")
+        font = Board.label_font()
+        self.goal_label.setFont(font)
+        self.level_label.setFont(font)
+        self.lines_to_goal_label.setFont(font)
+        self.score_label.setFont(font)
+        # Values currently displayed by the statistics labels
+        self.shown_goal = None
+        self.shown_level = None
+        self.shown_lines_to_goal = None
+        self.shown_score = None
+        self.init_labels()
 
         if self.multiplayer:
             self.other_boards = []
+            self.peer_boards = {}  # SmallBoard showing each peer socket's board
+            self.peers = []
+            self.board_state_dirty = False
+            self.broadcast_timer = QTimer(self)
+            self.broadcast_timer.timeout.connect(self.flush_board_state)
+            self.broadcast_timer.start(Board.BroadcastInterval)
+            self.peer_joined.connect(self.accept_connection)
+            self.peer_left.connect(self.drop_peer)
+            self.peer_message.connect(self.handle_message)
             self.other_boards_layout = QVBoxLayout()
             self.other_boards_widget = QWidget(self)
             self.other_boards_widget.setLayout(self.other_boards_layout)
@@ -472,127 +755,79 @@ class Board(QFrame):
             self.main_layout.addWidget(self)
             self.setLayout(self.main_layout)  # Moved after the widget setup
 
-            if self.is_host:
-                self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.server_socket.bind(("0.0.0.0", 0))  # Bind to any available port
-                self.server_socket.listen(5)
-                self.server_port = self.server_socket.getsockname()[1]
-                if not self.is_admin():
-                    self.run_as_admin()
-                else:
-                    self.allow_firewall_access(self.server_port)  # Add firewall rule
-                self.server_thread = threading.Thread(
-                    target=self.server_thread_func, daemon=True
-                )
-                self.server_thread.start()
-                host_ip = self.get_external_ip()
-                join_code = ipv4_port_to_base64(host_ip, self.server_port)
-                print(f"Join code: {join_code}")
-            else:
-                self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                host, port = base64_to_ipv4_port(self.join_code)
-                print(f"Connecting to server at {host}:{port}")
-                try:
-                    self.client_socket.connect((host, int(port)))
-                    self.client_thread = threading.Thread(
-                        target=self.client_thread_func, daemon=True
-                    )
-                    self.client_thread.start()
-                except ConnectionRefusedError as e:
-                    print(f"Connection refused: {e}")
-                except Exception as e:
-                    print(f"Failed to connect: {e}")
-
-    def is_admin(self):
-        try:
-            return ctypes.windll.shell32.IsUserAnAdmin()
-        except Exception as e:
-            print(f"Admin check failed: {e}")
-            return False
-
-    def run_as_admin(self):
-        script = os.path.abspath(sys.argv[0])
-        params = " ".join([script] + sys.argv[1:])
-        try:
-            ctypes.windll.shell32.ShellExecuteW(
-                None, "runas", sys.executable, params, None, 1
-            )
-        except Exception as e:
-            print(f"Failed to elevate privileges: {e}")
-        sys.exit(0)
-
-    def get_external_ip(self):
-        # This method retrieves the external IP address of the server
-        try:
-            response = requests.get("https://api.ipify.org?format=text")
-            if response.status_code == 200:
-                return response.text
-            else:
-                return "127.0.0.1"
-        except Exception:
-            return "127.0.0.1"
-
-    def allow_firewall_access(self, port):
-        if os.name == "nt":  # Only for Windows
-            rule_name = f"Tetris_Server_Port_{port}"
-            try:
-                subprocess.check_call(
-                    [
-                        "netsh",
-                        "advfirewall",
-                        "firewall",
-                        "add",
-                        "rule",
-                        f"name={rule_name}",
-                        "dir=in",
-                        "action=allow",
-                        "protocol=TCP",
-                        f"localport={port}",
-                    ]
-                )
-                print(f"Firewall rule added for port {port}")
-            except subprocess.CalledProcessError as e:
-                print(f"Failed to add firewall rule: {e}")
-
-    def server_thread_func(self):
-        while True:
+            # Events from the lobby's sockets now come to this board; late
+            # joiners on the host's listening socket get a board too
+            self.network = network
+            self.network.on_accept = self.peer_joined.emit
+            self.network.on_message = self.peer_message.emit
+            self.network.on_close = self.peer_left.emit
+            for sock in peers:
+                self.peers.append(sock)
+                self.add_peer_board(sock)
+
+    @Slot(object, object)
+    def accept_connection(self, client_socket, addr):
+        self.peers.append(client_socket)
+        self.add_peer_board(client_socket)
+        print(f"Accepted connection from {addr}")
+
+    def add_peer_board(self, sock):
+        """
+        Create the SmallBoard that shows the board received over a socket.
+        """
+        small_board = SmallBoard(self.other_boards_widget)
+        self.other_boards.append(small_board)
+        self.other_boards_layout.addWidget(small_board)
+        self.peer_boards[sock] = small_board
+
+    @Slot(object)
+    def drop_peer(self, sock):
+        """
+        Forget a peer whose connection closed and remove its SmallBoard.
+        """
+        if sock in self.peers:
+            self.peers.remove(sock)
+        small_board = self.peer_boards.pop(sock, None)
+        if small_board is not None:
+            self.other_boards.remove(small_board)
+            self.other_boards_layout.removeWidget(small_board)
+            small_board.deleteLater()
+
+    @Slot(object, object)
+    def handle_message(self, sock, data):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received %d bytes", len(data))
+        if not data:
+            return
+        opcode = data[0]
+        if opcode == MSG_BOARD_STATE:
+            if len(data) != 1 + Board.BoardHeight * Board.board_width:
+                logger.warning("Ignoring board state of %d bytes", len(data))
+                return
+            small_board = self.peer_boards.get(sock)
+            if small_board is not None:
+                small_board.update_board(data[1:])
+        elif opcode == MSG_GAME_OVER:
+            self.game.show_game_over("You Lost!")
+
+    def broadcast_board_state(self):
+        """
+        Send the settled cells of the board to every connected peer.
+        """
+        payload = bytes((MSG_BOARD_STATE,)) + b"".join(self.board)
+        for peer in self.peers:
             try:
-                client_socket, addr = self.server_socket.accept()
-                self.small_board = SmallBoard(self.other_boards_widget)
-                self.other_boards.append(self.small_board)
-                self.other_boards_layout.addWidget(self.small_board)
-                print(f"Accepted connection from {addr}")
-                threading.Thread(
-                    target=self.network_loop, args=(client_socket,), daemon=True
-                ).start()
+                send_frame(peer, payload)
             except Exception as e:
-                print(f"Server thread error: {e}")
-                traceback.print_exc()
-
-    def client_thread_func(self):
-        try:
-            self.network_loop(self.client_socket)
-        except Exception as e:
-            print(f"Client thread error: {e}")
-            traceback.print_exc()
+                logger.warning("Error sending board state: %s", e)
 
-    def network_loop(self, sock):
-        while True:
-            try:
-                data = sock.recv(1024).decode("utf-8")
-                if data:
-                    print(f"Received data: {data}")
-                    if data.startswith("board_state"):
-                        board_index, board_state = data.split(":")[1:]
-                        board_index = int(board_index)
-                        board_state = list(map(int, board_state.split(",")))
-                        self.small_board.update_board(board_state)
-                    elif data == "game_over":
-                        self.game.show_game_over("You Lost!")
-            except Exception as e:
-                print(f"Network loop error: {e}")
-                traceback.print_exc()
-                break
+    def flush_board_state(self):
+        """
+        Broadcast the board if it changed since the last broadcast.
+        """
+        if self.board_state_dirty:
+            self.board_state_dirty = False
+            self.broadcast_board_state()
 
     def start(self):
         """
@@ -605,12 +840,14 @@ class Board(QFrame):
         self.is_started = True
         self.is_waiting_after_line = False
         self.num_lines_removed = 0
+        self.speed = Board.Speed
         self.clear_board()
+        self.update()
 
         self.msg2Statusbar.emit(str(self.num_lines_removed))
 
         self.new_piece()
-        self.timer.start(Board.Speed, self)
+        self.timer.start(self.speed, self)
 
     def pause(self):
         """
@@ -624,12 +861,11 @@ class Board(QFrame):
         if self.is_paused:
             self.timer.stop()
             self.finalize_timer.stop()
-            self.left_key_timer.stop()
-            self.right_key_timer.stop()
-            self.down_key_timer.stop()
+            self.repeat_timer.stop()
+            self.held_keys.clear()
             self.msg2Statusbar.emit("Paused")
         else:
-            self.timer.start(Board.Speed, self)
+            self.timer.start(self.speed, self)
             self.msg2Statusbar.emit(str(self.num_lines_removed))
 
         self.update()
@@ -641,54 +877,63 @@ class Board(QFrame):
         """
         painter = QPainter(self)
         rect = self.contentsRect()
-
-        board_top = rect.bottom() - Board.BoardHeight * self.square_size()
-        self.draw_background_grid(painter)
-
-        for i in range(Board.BoardHeight):
-            for j in range(Board.board_width):
-                shape = self.shape_at(j, Board.BoardHeight - i - 1)
-
-                if shape != Tetrominoe.NoShape:
-                    self.draw_square(
-                        painter,
-                        rect.left() + j * self.square_size(),
-                        board_top + i * self.square_size(),
-                        shape,
-                    )
-
-        if self.current_piece.shape() != Tetrominoe.NoShape:
-            for i in range(4):
-                x = self.cur_x + self.current_piece.x(i)
-                y = self.cur_y - self.current_piece.y(i)
-                self.draw_square(
-                    painter,
-                    rect.left() + x * self.square_size(),
-                    board_top + (Board.BoardHeight - y - 1) * self.square_size(),
-                    self.current_piece.shape(),
-                )
-
+        sq = self.square_size()
+        # Locals for the loops below
+        width = Board.board_width
+        height = Board.BoardHeight
+        occ = self.occ
+        board = self.board
+
+        board_top = rect.bottom() - height * sq
+        xs = [rect.left() + j * sq for j in range(width + 1)]
+        ys = [board_top + i * sq for i in range(height + 1)]
+        self.draw_background_grid(painter, xs, ys)
+
+        # Top-left corners of the squares to draw, bucketed by shape
+        squares = [[] for _ in Board._COLORS]
+
+        # Only rows that intersect the repainted area need to be visited
+        first, last = 0, height - 1
+        if sq > 0:
+            clip = event.rect()
+            first = max(first, (clip.top() - board_top) // sq)
+            last = min(last, (clip.bottom() - board_top) // sq)
+
+        for i in range(first, last + 1):
+            y = height - i - 1
+            row = occ[y]
+            if not row:
+                continue
+            cells = board[y]
+            # Visit only the occupied columns, lowest set bit first
+            while row:
+                j = (row & -row).bit_length() - 1
+                squares[cells[j]].append((xs[j], ys[i]))
+                row &= row - 1
+
+        piece = self.current_piece
+        if piece.shape() != Tetrominoe.NoShape:
+            piece_squares = squares[piece.shape()]
+            cur_x, cur_y = self.cur_x, self.cur_y
+            for dx, dy in zip(piece._xs, piece._ys):
+                piece_squares.append((xs[cur_x + dx], ys[height - cur_y + dy - 1]))
+
+        self.draw_squares(painter, squares, sq)
         self.draw_next_piece(painter)
         self.draw_hold_piece(painter)
         self.labels()
 
-    def draw_background_grid(self, painter):
+    def draw_background_grid(self, painter, xs, ys):
         """
         Draw the grid background for the board.
+
+        ``xs`` and ``ys`` are the pixel positions of the vertical and
+        horizontal grid lines, as computed in ``paintEvent``.
         """
         painter.setPen(QPen(QColor(80, 80, 80), 1, Qt.PenStyle.SolidLine))
-        rect = self.contentsRect()
-        board_top = rect.bottom() - Board.BoardHeight * self.square_size()
-
-        for i in range(Board.board_width + 1):
-            x = rect.left() + i * self.square_size()
-            painter.drawLine(x, board_top, x, rect.bottom())
-
-        for i in range(Board.BoardHeight + 1):
-            y = board_top + i * self.square_size()
-            painter.drawLine(
-                rect.left(), y, rect.left() + Board.board_width * self.square_size(), y
-            )
+        lines = [QLine(x, ys[0], x, ys[-1]) for x in xs]
+        lines += [QLine(xs[0], y, xs[-1], y) for y in ys]
+        painter.drawLines(lines)
 
     @override
     def keyPressEvent(self, event):
@@ -710,15 +955,15 @@ class Board(QFrame):
 
         elif key == Qt.Key.Key_Left:
             self.move_left()
-            self.left_key_timer.start(Board.KeyRepeatDelay)
+            self.hold_key(key)
 
         elif key == Qt.Key.Key_Right:
             self.move_right()
-            self.right_key_timer.start(Board.KeyRepeatDelay)
+            self.hold_key(key)
 
         elif key == Qt.Key.Key_Down:
             self.move_down()
-            self.down_key_timer.start(Board.KeyRepeatDelay)
+            self.hold_key(key)
 
         elif key == Qt.Key.Key_Space:
             self.drop_down()
@@ -739,14 +984,27 @@ class Board(QFrame):
         """
         Handle key release events for stopping key repeats.
         """
-        key = event.key()
+        self.held_keys.discard(event.key())
+        if not self.held_keys:
+            self.repeat_timer.stop()
 
-        if key == Qt.Key.Key_Left:
-            self.left_key_timer.stop()
-        elif key == Qt.Key.Key_Right:
-            self.right_key_timer.stop()
-        elif key == Qt.Key.Key_Down:
-            self.down_key_timer.stop()
+    def hold_key(self, key):
+        """
+        Start repeating the move bound to a direction key while it is held.
+        """
+        self.held_keys.add(key)
+        self.repeat_timer.start(Board.KeyRepeatDelay)
+
+    def repeat_held_keys(self):
+        """
+        Repeat the moves of all currently held direction keys.
+        """
+        if Qt.Key.Key_Left in self.held_keys:
+            self.move_left()
+        if Qt.Key.Key_Right in self.held_keys:
+            self.move_right()
+        if Qt.Key.Key_Down in self.held_keys:
+            self.move_down()
 
     def move_left(self):
         """
@@ -784,18 +1042,26 @@ class Board(QFrame):
     def clear_board(self):
         """
         Clear the game board.
+
+        Each row is stored twice: as an occupancy bitmask in ``occ`` (bit ``x``
+        set when column ``x`` is filled) and as a ``bytearray`` of shape ids in
+        ``board``, addressed as ``board[y][x]``.
         """
-        self.board = [Tetrominoe.NoShape] * (Board.BoardHeight * Board.board_width)
+        self.occ = [0] * Board.BoardHeight
+        self.board = [bytearray(Board.board_width) for _ in range(Board.BoardHeight)]
 
     def drop_down(self):
         """
         Drop the current piece to the bottom.
         """
+        piece = self.current_piece
+        bits = PIECE_BITS[piece.piece_shape][piece.rotation]
+        occ = self.occ
+        x = self.cur_x
         new_y = self.cur_y
-        while new_y > 0:
-            if not self.try_move(self.current_piece, self.cur_x, new_y - 1):
-                break
+        while new_y > 0 and not bits_collide(occ, bits, x, new_y - 1, Board.FullRow):
             new_y -= 1
+        self.try_move(piece, x, new_y)
         self.piece_dropped()
 
     def one_line_down(self):
@@ -817,13 +1083,26 @@ class Board(QFrame):
         Finalize the placement of the current piece after it has landed.
         """
         self.finalize_timer.stop()
-        for i in range(4):
-            x = self.cur_x + self.current_piece.x(i)
-            y = self.cur_y - self.current_piece.y(i)
-            self.set_shape_at(x, y, self.current_piece.shape())
+        piece = self.current_piece
+        shape = piece.shape()
+        board = self.board
+        occ = self.occ
+        # set_shape_at inlined: a settling piece only ever fills cells
+        for dx, dy in zip(piece._xs, piece._ys):
+            x = self.cur_x + dx
+            y = self.cur_y - dy
+            board[y][x] = shape
+            occ[y] |= 1 << x
+            self.dirty_rows |= 1 << y
 
         self.remove_full_lines()
         self.is_landed = False
+        if self.dirty_rows:
+            self.update(self.rows_rect(self.dirty_rows))
+            self.dirty_rows = 0
+
+        if self.multiplayer:
+            self.board_state_dirty = True
 
         if not self.is_waiting_after_line:
             self.new_piece()
@@ -833,36 +1112,22 @@ class Board(QFrame):
         """
         Remove all full lines from the board and update the score.
         """
-        num_full_lines = 0
-        rows_to_remove = []
-
-        for i in range(Board.BoardHeight):
-            n = 0
-            for j in range(Board.board_width):
-                if not self.shape_at(j, i) == Tetrominoe.NoShape:
-                    n += 1
-
-            if n == 10:
-                rows_to_remove.append(i)
-
-        rows_to_remove.reverse()
-
-        for m in rows_to_remove:
-            for k in range(m, Board.BoardHeight - 1):
-                for l in range(Board.board_width):
-                    self.set_shape_at(l, k, self.shape_at(l, k + 1))
-            for l in range(Board.board_width):
-                self.set_shape_at(l, Board.BoardHeight - 1, Tetrominoe.NoShape)
-
-        num_full_lines += len(rows_to_remove)
+        kept = [i for i, row in enumerate(self.occ) if row != Board.FullRow]
+        num_full_lines = Board.BoardHeight - len(kept)
 
         if num_full_lines > 0:
-            self.num_lines_removed += len(rows_to_remove)
+            # Compact the surviving rows in one pass and pad the top with empties
+            self.occ = [self.occ[i] for i in kept] + [0] * num_full_lines
+            self.board = [self.board[i] for i in kept] + [
+                bytearray(Board.board_width) for _ in range(num_full_lines)
+            ]
+
+            self.num_lines_removed += num_full_lines
             self.msg2Statusbar.emit(str(self.num_lines_removed))
             self.is_waiting_after_line = True
             self.current_piece.set_shape(Tetrominoe.NoShape)
             self.update()
-            self.lines_to_goal += len(rows_to_remove)
+            self.lines_to_goal += num_full_lines
             # Update the speed based on goals reached
             if self.lines_to_goal >= self.goal:
                 if self.num_goals_reached != 0:
@@ -871,8 +1136,8 @@ class Board(QFrame):
                     self.goal = 5 + self.goal
                 self.lines_to_goal = 0
                 self.num_goals_reached += 1
-                Board.Speed -= Board.Speed / 4
-                self.timer.start(int(Board.Speed), self)
+                self.speed = max(Board.MinSpeed, self.speed - self.speed // 4)
+                self.timer.start(self.speed, self)
                 self.labels()
 
     def new_piece(self):
@@ -891,6 +1156,9 @@ class Board(QFrame):
             self.is_started = False
             self.msg2Statusbar.emit("Game over")
 
+        # The next piece preview changed as well
+        self.update(self.side_panel_rect())
+
     def hold_current_piece(self):
         """
         Hold the current piece, swapping with the held piece if any.
@@ -919,20 +1187,65 @@ class Board(QFrame):
         """
         Try to move the current piece to a new position.
         """
-        for i in range(4):
-            x = new_x + new_piece.x(i)
-            y = new_y - new_piece.y(i)
-            if x < 0 or x >= Board.board_width or y < 0 or y >= Board.BoardHeight:
-                return False
-            if self.shape_at(x, y) != Tetrominoe.NoShape:
-                return False
+        if self.collides(new_piece, new_x, new_y):
+            return False
 
+        # Only the cells the piece leaves and enters need repainting
+        old_rect = self.piece_rect(self.current_piece, self.cur_x, self.cur_y)
         self.current_piece = new_piece
         self.cur_x = new_x
         self.cur_y = new_y
-        self.update()
+        self.update(old_rect.united(self.piece_rect(new_piece, new_x, new_y)))
         return True
 
+    def rows_rect(self, rows):
+        """
+        Return the widget area covering every board row set in a row bitmask.
+        """
+        rect = self.contentsRect()
+        sq = self.square_size()
+        board_top = rect.bottom() - Board.BoardHeight * sq
+        low = (rows & -rows).bit_length() - 1
+        high = rows.bit_length() - 1
+        return QRect(
+            rect.left(),
+            board_top + (Board.BoardHeight - high - 1) * sq,
+            Board.board_width * sq,
+            (high - low + 1) * sq,
+        )
+
+    def side_panel_rect(self):
+        """
+        Return the widget area holding the next and hold piece previews.
+        """
+        rect = self.contentsRect()
+        return QRect(rect.right() - 200, rect.top(), 201, rect.height())
+
+    def piece_rect(self, piece, x, y):
+        """
+        Return the widget area covered by a piece at the given board position.
+        """
+        rect = self.contentsRect()
+        sq = self.square_size()
+        board_top = rect.bottom() - Board.BoardHeight * sq
+        min_x, max_x, min_y, max_y = ROTATED_EXTENTS[piece.piece_shape][
+            piece.rotation
+        ]
+        return QRect(
+            rect.left() + (x + min_x) * sq,
+            board_top + (Board.BoardHeight - y + min_y - 1) * sq,
+            (max_x - min_x + 1) * sq,
+            (max_y - min_y + 1) * sq,
+        )
+
+    def collides(self, piece, x, y):
+        """
+        Check whether a piece at the given position leaves the board or
+        overlaps a settled cell.
+        """
+        bits = PIECE_BITS[piece.piece_shape][piece.rotation]
+        return bits_collide(self.occ, bits, x, y, Board.FullRow)
+
     def try_rotate_right(self):
         """
         Try to rotate the current piece to the right.
@@ -953,139 +1266,208 @@ class Board(QFrame):
     def get_next_shape(self):
         """
         Get the next shape from the bag.
+
+        Several shuffled bags are queued at once so refills are rare.
         """
         if not self.bag:
-            self.bag = list(range(1, 8))
-            random.shuffle(self.bag)
-        return self.bag.pop()
-
-    def draw_square(self, painter, x, y, shape):
-        """
-        Draw a square for a piece on the board.
-        """
-        colors = [
-            QColor(169, 169, 169),  # NoShape - Dark Gray
-            QColor(255, 69, 69),  # ZShape - Medium Red
-            QColor(60, 179, 113),  # SShape - Medium Green
-            QColor(64, 224, 208),  # LineShape - Medium Cyan
-            QColor(186, 85, 211),  # TShape - Medium Purple
-            QColor(255, 255, 102),  # SquareShape - Medium Yellow
-            QColor(255, 140, 0),  # LShape - Medium Orange
-            QColor(30, 144, 255),  # MirroredLShape - Medium Blue
-        ]
+            shapes = list(range(1, 8))
+            for _ in range(Board.BagPrefetch):
+                self.bag_source.shuffle(shapes)
+                self.bag.extend(shapes)
+        return self.bag.popleft()
 
-        color = colors[shape]
+    def draw_squares(self, painter, squares, sz):
+        """
+        Draw squares of side ``sz`` in one batch per shape and edge.
 
-        painter.fillRect(
-            x + 1, y + 1, self.square_size() - 2, self.square_size() - 2, color
-        )
+        ``squares[shape]`` lists the top-left corners of that shape's squares.
+        """
+        far = sz - 1
+
+        painter.setPen(Qt.PenStyle.NoPen)
+        for shape, corners in enumerate(squares):
+            if corners:
+                painter.setBrush(Board._COLORS[shape])
+                painter.drawRects(
+                    [QRect(x + 1, y + 1, sz - 2, sz - 2) for x, y in corners]
+                )
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+
+        for shape, corners in enumerate(squares):
+            if not corners:
+                continue
+            painter.setPen(Board._LIGHT_PENS[shape])
+            lines = [QLine(x, y + far, x, y) for x, y in corners]
+            lines += [QLine(x, y, x + far, y) for x, y in corners]
+            painter.drawLines(lines)
+
+            painter.setPen(Board._DARK_PENS[shape])
+            lines = [QLine(x + 1, y + far, x + far, y + far) for x, y in corners]
+            lines += [QLine(x + far, y + far, x + far, y + 1) for x, y in corners]
+            painter.drawLines(lines)
+
+    def draw_square(self, painter, x, y, shape, sz):
+        """
+        Draw a square of side ``sz`` for a piece on the board.
+        """
+        color = Board._COLORS[shape]
+        far = sz - 1
 
-        painter.setPen(color.lighter())
-        painter.drawLine(x, y + self.square_size() - 1, x, y)
-        painter.drawLine(x, y, x + self.square_size() - 1, y)
+        painter.fillRect(x + 1, y + 1, sz - 2, sz - 2, color)
 
-        painter.setPen(color.darker())
-        painter.drawLine(
-            x + 1,
-            y + self.square_size() - 1,
-            x + self.square_size() - 1,
-            y + self.square_size() - 1,
+        # Lighter top-left edge, then darker bottom-right edge
+        painter.setPen(Board._LIGHT_PENS[shape])
+        painter.drawPolyline(
+            QPolygon([QPoint(x, y + far), QPoint(x, y), QPoint(x + far, y)])
         )
-        painter.drawLine(
-            x + self.square_size() - 1,
-            y + self.square_size() - 1,
-            x + self.square_size() - 1,
-            y + 1,
+
+        painter.setPen(Board._DARK_PENS[shape])
+        painter.drawPolyline(
+            QPolygon(
+                [
+                    QPoint(x + 1, y + far),
+                    QPoint(x + far, y + far),
+                    QPoint(x + far, y + 1),
+                ]
+            )
         )
 
     def draw_next_piece(self, painter):
         """
         Draw the next piece preview.
         """
-        self.next_piece_label.setText("Next Piece:")
-        self.next_piece_label.setGeometry(
-            self.contentsRect().right() - 200, 20, 150, 30
-        )
-        self.next_piece_label.show()
+        piece = self.next_piece
+        shape = piece.shape()
+        sz = self.square_size()
 
-        for i in range(4):
-            x = 1 + self.next_piece.x(i)
-            y = 1 + self.next_piece.y(i)
-            self.draw_square(
-                painter,
-                self.contentsRect().right() - 170 + x * self.square_size(),
-                60 + y * self.square_size(),
-                self.next_piece.shape(),
-            )
+        for x, y in self.preview_offsets()[shape][piece.rotation]:
+            self.draw_square(painter, x, 60 + y, shape, sz)
 
     def draw_hold_piece(self, painter):
         """
         Draw the held piece preview.
         """
-        self.hold_piece_label.setText("Hold Piece:")
-        self.hold_piece_label.setGeometry(
-            self.contentsRect().right() - 200, 200, 150, 30
-        )
-        self.hold_piece_label.show()
+        piece = self.hold_piece
+        shape = piece.shape()
+        sz = self.square_size()
 
-        if self.hold_piece.shape() != Tetrominoe.NoShape:
-            for i in range(4):
-                x = 1 + self.hold_piece.x(i)
-                y = 1 + self.hold_piece.y(i)
-                self.draw_square(
-                    painter,
-                    self.contentsRect().right() - 170 + x * self.square_size(),
-                    240 + y * self.square_size(),
-                    self.hold_piece.shape(),
-                )
+        if shape != Tetrominoe.NoShape:
+            for x, y in self.preview_offsets()[shape][piece.rotation]:
+                self.draw_square(painter, x, 240 + y, shape, sz)
 
-    def labels(self):
+    @classmethod
+    def label_font(cls):
         """
-        Update and display game statistics labels.
+        Return the font shared by the statistics labels.
+
+        It is created on first use, once a QApplication exists.
         """
-        font = QFont("SansSerif", 14, QFont.Weight.Bold)
+        if cls._label_font is None:
+            cls._label_font = QFont("SansSerif", 14, QFont.Weight.Bold)
+        return cls._label_font
 
-        self.goal_label.setFont(font)
-        self.level_label.setFont(font)
-        self.lines_to_goal_label.setFont(font)
-        self.score_label.setFont(font)
-        self.goal_label.setText(f"Goal: {self.goal}")
-        self.level_label.setText(f"Level: {self.num_goals_reached + 1}")
-        difference = int(self.goal) - int(self.lines_to_goal)
-        self.lines_to_goal_label.setText(f"Lines to goal: {difference}")
-        self.score_label.setText(f"Score: {self.num_lines_removed * 1000}")
-        self.goal_label.setGeometry(self.contentsRect().right() - 200, 400, 150, 30)
-        self.level_label.setGeometry(self.contentsRect().right() - 200, 430, 150, 30)
-        self.lines_to_goal_label.setGeometry(
-            self.contentsRect().right() - 200, 460, 210, 30
-        )
-        self.score_label.setGeometry(self.contentsRect().right() - 200, 490, 150, 30)
+    def init_labels(self):
+        """
+        Position and show the side panel labels.
+        """
+        left = self.contentsRect().right() - 200
+
+        self.next_piece_label.setGeometry(left, 20, 150, 30)
+        self.hold_piece_label.setGeometry(left, 200, 150, 30)
+        self.goal_label.setGeometry(left, 400, 150, 30)
+        self.level_label.setGeometry(left, 430, 150, 30)
+        self.lines_to_goal_label.setGeometry(left, 460, 210, 30)
+        self.score_label.setGeometry(left, 490, 150, 30)
+        self.next_piece_label.show()
+        self.hold_piece_label.show()
         self.goal_label.show()
         self.level_label.show()
         self.lines_to_goal_label.show()
         self.score_label.show()
 
+    def labels(self):
+        """
+        Update the game statistics labels whose values changed.
+        """
+        goal_changed = self.goal != self.shown_goal
+        if goal_changed:
+            self.shown_goal = self.goal
+            self.goal_label.setText(Board._GOAL_FMT % self.goal)
+        level = self.num_goals_reached + 1
+        if level != self.shown_level:
+            self.shown_level = level
+            self.level_label.setText(Board._LEVEL_FMT % level)
+        if goal_changed or self.lines_to_goal != self.shown_lines_to_goal:
+            self.shown_lines_to_goal = self.lines_to_goal
+            difference = int(self.goal) - int(self.lines_to_goal)
+            self.lines_to_goal_label.setText(Board._LINES_TO_GOAL_FMT % difference)
+        score = self.num_lines_removed * 1000
+        if score != self.shown_score:
+            self.shown_score = score
+            self.score_label.setText(Board._SCORE_FMT % score)
+
     def shape_at(self, x, y):
         """
         Return the shape at the given board coordinates.
         """
-        return self.board[(y * Board.board_width) + x]
+        return self.board[y][x]
 
     def set_shape_at(self, x, y, shape):
         """
         Set the shape at the given board coordinates.
         """
-        self.board[(y * Board.board_width) + x] = shape
+        self.board[y][x] = shape
+        self.dirty_rows |= 1 << y
+        if shape == Tetrominoe.NoShape:
+            self.occ[y] &= ~(1 << x)
+        else:
+            self.occ[y] |= 1 << x
 
     def square_size(self):
         """
         Return the size of one square on the board.
+
+        The value is cached until the next resize.
         """
-        rect = self.contentsRect()
-        board_width = rect.width() * 2 // 3  # Two-thirds of the width for the board
-        square_width = board_width // Board.board_width
-        square_height = rect.height() // Board.BoardHeight
-        return min(square_width, square_height)
+        if self.square_size_cache is None:
+            rect = self.contentsRect()
+            # Two-thirds of the width for the board
+            board_width = rect.width() * 2 // 3
+            square_width = board_width // Board.board_width
+            square_height = rect.height() // Board.BoardHeight
+            self.square_size_cache = min(square_width, square_height)
+        return self.square_size_cache
+
+    def preview_offsets(self):
+        """
+        Return the pixel positions of preview squares by shape and rotation.
+
+        The x values are absolute; the y values are relative to the top of
+        the preview. The table is cached until the next resize.
+        """
+        if self.preview_offsets_cache is None:
+            left = self.contentsRect().right() - 170
+            sz = self.square_size()
+            self.preview_offsets_cache = tuple(
+                tuple(
+                    tuple(
+                        (left + (1 + dx) * sz, (1 + dy) * sz) for dx, dy in coords
+                    )
+                    for coords in rotations
+                )
+                for rotations in ROTATED_COORDS
+            )
+        return self.preview_offsets_cache
+
+    @override
+    def resizeEvent(self, event):
+        """
+        Invalidate cached geometry when the board is resized.
+        """
+        self.square_size_cache = None
+        self.preview_offsets_cache = None
+        self.init_labels()
+        super(Board, self).resizeEvent(event)
 
 
 class SmallBoard(QWidget):
@@ -1093,17 +1475,32 @@ class SmallBoard(QWidget):
     Smaller representation of the game board for other players in multiplayer.
     """
 
+    ColorTable = (
+        0x000000,
+        0xCC6666,
+        0x66CC66,
+        0x6666CC,
+        0xCCCC66,
+        0xCC66CC,
+        0x66CCCC,
+        0xDAAA00,
+    )
+    _COLORS = tuple(QColor(rgb) for rgb in ColorTable)
+    _LIGHTER = tuple(color.lighter() for color in _COLORS)
+    _DARKER = tuple(color.darker() for color in _COLORS)
+
     def __init__(self, parent):
         super().__init__(parent)
-        self.board = []
+        self.board = b""
 
         self.setFixedSize(100, 220)  # Set size for small board
         self.clear_board()
 
     def clear_board(self):
-        self.board = [Tetrominoe.NoShape] * (Board.BoardHeight * Board.board_width)
+        # One byte per cell, the same layout update_board receives
+        self.board = bytes(Board.BoardHeight * Board.board_width)
 
-    @Slot(list)
+    @Slot(bytes)
     def update_board(self, board_state):
         self.board = board_state
         self.update()
@@ -1113,18 +1510,29 @@ class SmallBoard(QWidget):
         painter = QPainter(self)
         rect = self.contentsRect()
 
-        board_top = rect.bottom() - Board.BoardHeight * self.square_height()
-
-        for i in range(Board.BoardHeight):
-            for j in range(Board.board_width):
-                shape = self.shape_at(j, Board.BoardHeight - i - 1)
-                if shape != Tetrominoe.NoShape:
-                    self.draw_square(
-                        painter,
-                        rect.left() + j * self.square_width(),
-                        board_top + i * self.square_height(),
-                        shape,
-                    )
+        sw = self.square_width()
+        sh = self.square_height()
+
+        # Locals for the loops below
+        board = self.board
+        width = Board.board_width
+        height = Board.BoardHeight
+        no_shape = Tetrominoe.NoShape
+        left = rect.left()
+        draw_square = self.draw_square
+
+        board_top = rect.bottom() - height * sh
+
+        for y in range(height - 1, -1, -1):
+            base = y * width
+            # Rows with no occupied cells have nothing to draw
+            if board.count(no_shape, base, base + width) == width:
+                continue
+            top = board_top + (height - 1 - y) * sh
+            for x in range(width):
+                shape = board[base + x]
+                if shape != no_shape:
+                    draw_square(painter, left + x * sw, top, shape, sw, sh)
 
     def shape_at(self, x, y):
         return self.board[(y * Board.board_width) + x]
@@ -1135,39 +1543,22 @@ class SmallBoard(QWidget):
     def square_height(self):
         return self.contentsRect().height() // Board.BoardHeight
 
-    def draw_square(self, painter, x, y, shape):
-        colors = [
-            0x000000,
-            0xCC6666,
-            0x66CC66,
-            0x6666CC,
-            0xCCCC66,
-            0xCC66CC,
-            0x66CCCC,
-            0xDAAA00,
-        ]
+    def draw_square(self, painter, x, y, shape, sw, sh):
+        color = SmallBoard._COLORS[shape]
+        right = x + sw - 1
+        bottom = y + sh - 1
+        painter.fillRect(x + 1, y + 1, sw - 2, sh - 2, color)
 
-        color = QColor(colors[shape])
-        painter.fillRect(
-            x + 1, y + 1, self.square_width() - 2, self.square_height() - 2, color
+        painter.setPen(SmallBoard._LIGHTER[shape])
+        painter.drawPolyline(
+            QPolygon([QPoint(x, bottom), QPoint(x, y), QPoint(right, y)])
         )
 
-        painter.setPen(color.lighter())
-        painter.drawLine(x, y + self.square_height() - 1, x, y)
-        painter.drawLine(x, y, x + self.square_width() - 1, y)
-
-        painter.setPen(color.darker())
-        painter.drawLine(
-            x + 1,
-            y + self.square_height() - 1,
-            x + self.square_width() - 1,
-            y + self.square_height() - 1,
-        )
-        painter.drawLine(
-            x + self.square_width() - 1,
-            y + self.square_height() - 1,
-            x + self.square_width() - 1,
-            y + 1,
+        painter.setPen(SmallBoard._DARKER[shape])
+        painter.drawPolyline(
+            QPolygon(
+                [QPoint(x + 1, bottom), QPoint(right, bottom), QPoint(right, y + 1)]
+            )
         )
 
 
@@ -1186,6 +1577,52 @@ class Tetrominoe(object):
     MirroredLShape = 7
 
 
+class XorShift64(object):
+    """
+    Small xorshift64 generator for gameplay randomness.
+    """
+
+    Mask = 0xFFFFFFFFFFFFFFFF
+
+    def __init__(self, seed=None):
+        """
+        Seed the generator, from the OS entropy pool unless a seed is given.
+        """
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), "little")
+        # An all-zero state would only ever produce zeros
+        self.state = (seed & XorShift64.Mask) or 0x9E3779B97F4A7C15
+
+    def next(self):
+        """
+        Advance the generator and return the next 64-bit value.
+        """
+        s = self.state
+        s ^= (s << 13) & XorShift64.Mask
+        s ^= s >> 7
+        s ^= (s << 17) & XorShift64.Mask
+        self.state = s
+        return s
+
+    def randint(self, a, b):
+        """
+        Return an integer in the inclusive range [a, b].
+        """
+        return a + self.next() % (b - a + 1)
+
+    def shuffle(self, items):
+        """
+        Shuffle a list in place with a Fisher-Yates pass.
+        """
+        for i in range(len(items) - 1, 0, -1):
+            j = self.next() % (i + 1)
+            items[i], items[j] = items[j], items[i]
+
+
+# Shared source for Shape.set_random_shape
+_shape_source = XorShift64()
+
+
 class Shape(object):
     """
     Representation of a Tetris piece with various shapes.
@@ -1206,11 +1643,12 @@ class Shape(object):
         """
         Initialize the shape with no specific shape.
         """
-        self.coords = [[0, 0] for _ in range(4)]
         self.piece_shape = Tetrominoe.NoShape
-
-        self.set_shape(Tetrominoe.NoShape)
-        super().__init__()
+        self.rotation = 0
+        # x and y offsets of the four cells, kept as separate tuples; aliases
+        # of the precomputed rotation tables, never copied
+        self._xs = ROTATED_XS[Tetrominoe.NoShape][0]
+        self._ys = ROTATED_YS[Tetrominoe.NoShape][0]
 
     def shape(self):
         """
@@ -1221,80 +1659,66 @@ class Shape(object):
     def set_shape(self, shape):
         """
         Set the shape to the specified type.
-        """
-        table = Shape.coordsTable[shape]
-
-        for i in range(4):
-            for j in range(2):
-                self.coords[i][j] = table[i][j]
 
+        This only rebinds references into the precomputed rotation table.
+        """
         self.piece_shape = shape
+        self.rotation = 0
+        self._xs = ROTATED_XS[shape][0]
+        self._ys = ROTATED_YS[shape][0]
 
     def set_random_shape(self):
         """
         Set the shape to a random type.
         """
-        self.set_shape(random.randint(1, 7))
+        self.set_shape(_shape_source.randint(1, 7))
 
     def x(self, index):
         """
         Get the x-coordinate of the specified index.
         """
-        return self.coords[index][0]
+        return self._xs[index]
 
     def y(self, index):
         """
         Get the y-coordinate of the specified index.
         """
-        return self.coords[index][1]
-
-    def set_x(self, index, x):
-        """
-        Set the x-coordinate of the specified index.
-        """
-        self.coords[index][0] = x
-
-    def set_y(self, index, y):
-        """
-        Set the y-coordinate of the specified index.
-        """
-        self.coords[index][1] = y
+        return self._ys[index]
 
     def min_x(self):
         """
         Get the minimum x-coordinate of the shape.
         """
-        m = self.coords[0][0]
-        for i in range(4):
-            m = min(m, self.coords[i][0])
-        return m
+        return ROTATED_EXTENTS[self.piece_shape][self.rotation][0]
 
     def max_x(self):
         """
         Get the maximum x-coordinate of the shape.
         """
-        m = self.coords[0][0]
-        for i in range(4):
-            m = max(m, self.coords[i][0])
-        return m
+        return ROTATED_EXTENTS[self.piece_shape][self.rotation][1]
 
     def min_y(self):
         """
         Get the minimum y-coordinate of the shape.
         """
-        m = self.coords[0][1]
-        for i in range(4):
-            m = min(m, self.coords[i][1])
-        return m
+        return ROTATED_EXTENTS[self.piece_shape][self.rotation][2]
 
     def max_y(self):
         """
         Get the maximum y-coordinate of the shape.
         """
-        m = self.coords[0][1]
-        for i in range(4):
-            m = max(m, self.coords[i][1])
-        return m
+        return ROTATED_EXTENTS[self.piece_shape][self.rotation][3]
+
+    def rotated(self, rotation):
+        """
+        Return a new shape of the same type in the given rotation.
+        """
+        result = Shape()
+        result.piece_shape = self.piece_shape
+        result.rotation = rotation
+        result._xs = ROTATED_XS[self.piece_shape][rotation]
+        result._ys = ROTATED_YS[self.piece_shape][rotation]
+        return result
 
     def rotate_left(self):
         """
@@ -1303,14 +1727,7 @@ class Shape(object):
         if self.piece_shape == Tetrominoe.SquareShape:
             return self
 
-        result = Shape()
-        result.piece_shape = self.piece_shape
-
-        for i in range(4):
-            result.set_x(i, self.y(i))
-            result.set_y(i, -self.x(i))
-
-        return result
+        return self.rotated((self.rotation - 1) & 3)
 
     def rotate_right(self):
         """
@@ -1319,14 +1736,81 @@ class Shape(object):
         if self.piece_shape == Tetrominoe.SquareShape:
             return self
 
-        result = Shape()
-        result.piece_shape = self.piece_shape
+        return self.rotated((self.rotation + 1) & 3)
 
-        for i in range(4):
-            result.set_x(i, -self.y(i))
-            result.set_y(i, self.x(i))
 
-        return result
+def _rotations(coords):
+    """
+    Return the four orientations of a piece, each rotated right from the last.
+    """
+    rotations = [coords]
+    for _ in range(3):
+        rotations.append(tuple((-y, x) for x, y in rotations[-1]))
+    return tuple(rotations)
+
+def _row_masks(coords):
+    """
+    Return a piece's cells as ``(dy, min_dx, mask)`` tuples, one per row.
+
+    Bit ``i`` of ``mask`` is set when the cell at ``min_dx + i`` is filled,
+    so shifting the mask left by ``x + min_dx`` lines it up with a board row.
+    """
+    rows = {}
+    for dx, dy in coords:
+        rows.setdefault(dy, []).append(dx)
+    return tuple(
+        (dy, min(dxs), sum(1 << (dx - min(dxs)) for dx in set(dxs)))
+        for dy, dxs in rows.items()
+    )
+
+def bits_collide(occ, bits, x, y, full_row):
+    """
+    Check piece row bitmasks placed at (x, y) against board occupancy rows.
+
+    Takes only plain ints and tuples so it does no attribute lookups;
+    ``full_row`` is the mask of a complete board row.
+    """
+    height = len(occ)
+    for dy, min_dx, mask in bits:
+        row = y - dy
+        left = x + min_dx
+        if left < 0 or row < 0 or row >= height:
+            return True
+        shifted = mask << left
+        if shifted & ~full_row or shifted & occ[row]:
+            return True
+    return False
+
+# Indexed by [shape][rotation]; the square looks the same in every rotation
+ROTATED_COORDS = tuple(
+    (coords,) * 4 if shape == Tetrominoe.SquareShape else _rotations(coords)
+    for shape, coords in enumerate(Shape.coordsTable)
+)
+# The same tables split into separate x and y offset tuples
+ROTATED_XS = tuple(
+    tuple(tuple(x for x, _ in coords) for coords in rotations)
+    for rotations in ROTATED_COORDS
+)
+ROTATED_YS = tuple(
+    tuple(tuple(y for _, y in coords) for coords in rotations)
+    for rotations in ROTATED_COORDS
+)
+# (min_x, max_x, min_y, max_y) of each entry in ROTATED_COORDS
+ROTATED_EXTENTS = tuple(
+    tuple(
+        (
+            min(x for x, _ in coords),
+            max(x for x, _ in coords),
+            min(y for _, y in coords),
+            max(y for _, y in coords),
+        )
+        for coords in rotations
+    )
+    for rotations in ROTATED_COORDS
+)
+PIECE_BITS = tuple(
+    tuple(_row_masks(coords) for coords in rotations) for rotations in ROTATED_COORDS
+)
 
 
 if __name__ == "__main__":